@@ -1,15 +1,21 @@
+import io
 import re
 import emoji
 import pandas as pd
-from datetime import datetime
 from collections import Counter
 import streamlit as st
 import matplotlib.pyplot as plt
-from wordcloud import WordCloud
+from wordcloud import WordCloud, STOPWORDS as WORDCLOUD_STOPWORDS
 import seaborn as sns
 import plotly.express as px
+import plotly.graph_objects as go
 import numpy as np
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 # -----------------------------
 # Streamlit Config (Dark Mode)
 # -----------------------------
@@ -22,29 +28,59 @@ sns.set_style("darkgrid")
 # -----------------------------
 # Chat Parsing
 # -----------------------------
-def parse_chat(text):
-    pattern = r"(\d{2}/\d{2}/\d{4}), (\d{2}):(\d{2}) - ([^:]+): (.*)"
-    matches = re.findall(pattern, text)
-
-    chat_array = []
-    for date_str, hour, minute, name, message in matches:
-        dt = datetime.strptime(f"{date_str}, {hour}:{minute}", "%d/%m/%Y, %H:%M")
-        total_minutes = int(dt.timestamp() // 60)
-        chat_array.append({
-            "Datetime": dt,
-            "Date": dt.date(),
-            "Minutes": total_minutes,
-            "User": name.strip(),
-            "Message": message.strip(),
-            "Letters": len(message),
-            "Words": len(message.split()),
-            "Emoji_Count": sum(1 for ch in message if ch in emoji.EMOJI_DATA)
-        })
-    return pd.DataFrame(chat_array)
+def build_emoji_regex():
+    tails = {}
+    for e in sorted(emoji.EMOJI_DATA, key=len, reverse=True):
+        tails.setdefault(e[0], []).append(re.escape(e[1:]))
+    branches = "|".join(f"{re.escape(first)}(?:{'|'.join(rest)})" for first, rest in tails.items())
+    # Every emoji starts with a keycap base or a char in these ranges, so plain text
+    # fails the lookahead instead of walking thousands of alternatives
+    return re.compile(rf"(?=[#*0-9][\ufe0f\u20e3]|[\xa9\xae\u203c-\u3299\U0001f000-\U0001ffff])(?:{branches})")
+
+LINE_START_RE = re.compile(r"\d{2}/\d{2}/\d{4}, \d{2}:\d{2} - ")
+CHAT_RE = re.compile(r"(\d{2}/\d{2}/\d{4}), (\d{2}):(\d{2}) - ([^:]+): (.*)")
+EMOJI_RE = build_emoji_regex()
+
+@st.cache_data(show_spinner=False)
+def parse_chat(data):
+    dates, hours, minutes, users, messages = [], [], [], [], []
+    in_message = False
+    for line in io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig"):
+        match = CHAT_RE.match(line)
+        if match:
+            date, hour, minute, user, message = match.groups()
+            dates.append(date)
+            hours.append(hour)
+            minutes.append(minute)
+            users.append(user)
+            messages.append(message)
+            in_message = True
+        elif LINE_START_RE.match(line):
+            # System notices ("X added Y", encryption banner) are not messages
+            in_message = False
+        elif in_message:
+            # Multi-line message: continuation lines carry no timestamp
+            messages[-1] += "\n" + line.rstrip("\n")
+
+    df = pd.DataFrame({"date": dates, "hour": hours, "minute": minutes, "User": users, "Message": messages})
+    if df.empty:
+        return df
+    df["Datetime"] = pd.to_datetime(df["date"] + " " + df["hour"] + ":" + df["minute"], format="%d/%m/%Y %H:%M")
+    df["Date"] = df["Datetime"].dt.date
+    df["Minutes"] = df["Datetime"].values.astype("datetime64[m]").astype("int64")
+    users = df["User"].str.strip()
+    df["User"] = pd.Categorical(users, categories=pd.unique(users))
+    df["Letters"] = df["Message"].str.len()
+    df["Message"] = df["Message"].str.strip()
+    df["Words"] = df["Message"].str.split().str.len()
+    df["Emoji_Count"] = df["Message"].str.count(EMOJI_RE)
+    df = df.astype({"Letters": "int32", "Words": "int32", "Emoji_Count": "int32"})
+    return df.drop(columns=["date", "hour", "minute"])
 
 # -----------------------------
 # Summaries
 # -----------------------------
+@st.cache_data(show_spinner=False)
 def summarize_data(df):
     total = {
         "Messages": len(df),
@@ -53,28 +89,98 @@ def summarize_data(df):
         "Emojis": df["Emoji_Count"].sum()
     }
 
-    daywise = df.groupby(["Date", "User"]).agg({
-        "Message": "count",
-        "Words": "sum",
-        "Letters": "sum",
-        "Emoji_Count": "sum"
-    }).reset_index().rename(columns={"Message": "Messages"})
+    daywise = df.groupby(["Date", "User"], sort=False, observed=True).agg(
+        Messages=("Message", "size"),
+        Words=("Words", "sum"),
+        Letters=("Letters", "sum"),
+        Emoji_Count=("Emoji_Count", "sum")
+    ).reset_index()
+
+    # Userwise totals are a rollup of the (much smaller) daywise frame
+    userwise = daywise.groupby("User", sort=False, observed=True)[["Messages", "Words", "Letters", "Emoji_Count"]].sum().reset_index()
 
     daywise["Emoji/msg %"] = (daywise["Emoji_Count"] / daywise["Messages"] * 100).round(2)
     daywise["Emoji/letters %"] = (daywise["Emoji_Count"] / daywise["Letters"] * 100).round(4)
 
-    userwise = df.groupby("User").agg({
-        "Message": "count",
-        "Words": "sum",
-        "Letters": "sum",
-        "Emoji_Count": "sum"
-    }).reset_index().rename(columns={"Message": "Messages"})
-
     userwise["Emoji/msg %"] = (userwise["Emoji_Count"] / userwise["Messages"] * 100).round(2)
     userwise["Emoji/letters %"] = (userwise["Emoji_Count"] / userwise["Letters"] * 100).round(4)
 
     return total, daywise, userwise
 
+# -----------------------------
+# Word & Emoji Stats
+# -----------------------------
+STOPWORDS = {"the", "is", "and", "to", "a", "of", "in", "on", "it", "for", "that", "me", "i", "you", "my"}
+
+@st.cache_data(show_spinner=False)
+def word_stats(data):
+    df = parse_chat(data)
+    words = df["Message"].str.lower().str.findall(r"\b[a-z']+\b").explode().dropna()
+    counts = words[~words.isin(STOPWORDS)].value_counts()
+    freq = list(counts.head(25).items())
+    # WordCloud.generate() would drop its own stopword list, keep the cloud the same
+    cloud_counts = counts[~counts.index.isin(WORDCLOUD_STOPWORDS)]
+    # WordCloud only draws its 200 (max_words) most frequent words anyway
+    return freq, cloud_counts.head(200).to_dict()
+
+@st.cache_data(show_spinner=False)
+def render_wordcloud(frequencies):
+    wc = WordCloud(width=800, height=400, background_color="black", colormap="plasma").generate_from_frequencies(frequencies)
+    return wc.to_array()
+
+@st.cache_data(show_spinner=False)
+def emoji_stats(data):
+    df = parse_chat(data)
+    # Only rescan messages already known to contain emojis
+    counts = Counter()
+    for found in df.loc[df["Emoji_Count"] > 0, "Message"].str.findall(EMOJI_RE):
+        counts.update(found)
+    return counts.most_common(10)
+
+# -----------------------------
+# Hourly Activity
+# -----------------------------
+@st.cache_data(show_spinner=False)
+def hourly_activity(data):
+    df = parse_chat(data)
+    df["Hour"] = df["Datetime"].dt.hour.astype("int8")
+    counts = df.groupby(["User", "Hour"], observed=True).size()
+    return counts.unstack(fill_value=0).reindex(columns=range(24), fill_value=0)
+
+# -----------------------------
+# Reply Lag
+# -----------------------------
+if njit is not None:
+    @njit(cache=True)
+    def reply_lag_totals(codes, minutes, lag_sum, lag_count):
+        for i in range(1, codes.size):
+            if codes[i] != codes[i - 1]:
+                lag_sum[codes[i]] += minutes[i] - minutes[i - 1]
+                lag_count[codes[i]] += 1
+
+@st.cache_data(show_spinner=False)
+def average_reply_lag(data):
+    df = parse_chat(data)
+    if njit is not None:
+        # Single compiled pass over user codes, summing lag per responder
+        users = df["User"].cat.categories
+        lag_sum = np.zeros(len(users), dtype=np.int64)
+        lag_count = np.zeros(len(users), dtype=np.int64)
+        reply_lag_totals(df["User"].cat.codes.to_numpy(np.int32), df["Minutes"].to_numpy(np.int64), lag_sum, lag_count)
+        replied = lag_count > 0
+        return pd.Series(lag_sum[replied] / lag_count[replied], index=pd.Index(users[replied], name="Responder"),
+                         name="Lag_Min").round(2)
+
+    prev_user = df["User"].shift()
+    prev_minutes = df["Minutes"].shift()
+    replies = prev_user.notna() & (prev_user != df["User"])
+    lag_df = pd.DataFrame({
+        "Sender": prev_user[replies],
+        "Responder": df["User"][replies],
+        "Lag_Min": (df["Minutes"] - prev_minutes)[replies]
+    })
+    return lag_df.groupby("Responder", observed=True)["Lag_Min"].mean().round(2)
+
 # -----------------------------
 # Default Sample
 # -----------------------------
@@ -89,12 +195,12 @@ st.markdown("Analyze chat patterns, emoji usage, word trends, and more — beaut
 
 uploaded = st.file_uploader("📂 Upload WhatsApp Chat (.txt)", type=["txt"])
 if uploaded:
-    text = uploaded.read().decode("utf-8")
+    data = uploaded.getvalue()
 else:
-    text = default_chat
+    data = default_chat.encode("utf-8")
     st.info("📄 Using default demo chat")
 
-df = parse_chat(text)
+df = parse_chat(data)
 if df.empty:
     st.warning("No messages found!")
     st.stop()
@@ -131,14 +237,23 @@ with tabs[0]:
                  title="💬 Messages per User", color_discrete_sequence=px.colors.qualitative.Dark2)
     st.plotly_chart(fig, use_container_width=True)
     
+    # Chats spanning more than a year are charted per week to keep the bar count bounded
+    metrics = ["Messages", "Words", "Letters"]
+    period = "Day"
+    trend_df = daywise
+    if daywise["Date"].nunique() > 365:
+        period = "Week"
+        week = pd.to_datetime(daywise["Date"]).dt.to_period("W").dt.start_time.dt.date
+        trend_df = daywise.assign(Date=week).groupby(["Date", "User"], sort=False, observed=True)[metrics].sum().reset_index()
+
     # Daily total messages
-    st.subheader("📅 Total Messages per Day")
-    daily_counts = df.groupby("Date")["Message"].count().reset_index().rename(columns={"Message": "Total_Messages"})
+    st.subheader(f"📅 Total Messages per {period}")
+    daily_counts = trend_df.groupby("Date", as_index=False)["Messages"].sum().rename(columns={"Messages": "Total_Messages"})
     fig_daily = px.bar(
         daily_counts,
         x="Date",
         y="Total_Messages",
-        title="💬 Total Messages per Day",
+        title=f"💬 Total Messages per {period}",
         text="Total_Messages",
         color="Total_Messages",
         color_continuous_scale="Viridis"
@@ -147,77 +262,49 @@ with tabs[0]:
     st.plotly_chart(fig_daily, use_container_width=True)
     
     # Daywise percentage contributions
-    st.subheader("📊 Daywise User Contribution (%)")
-    trend_df = daywise.copy()
-    for metric in ["Messages", "Words", "Letters"]:
-        trend_df[f"{metric}_%"] = trend_df.groupby("Date")[metric].transform(lambda x: x / x.sum() * 100)
-    
-    # Messages %
-    fig1 = px.bar(
-        trend_df,
-        x="Date",
-        y="Messages_%",
-        color="User",
-        title="💬 % of Messages per User by Day",
-        text_auto=".1f",
-        color_discrete_sequence=px.colors.qualitative.Dark24
-    )
-    fig1.update_layout(barmode="stack", xaxis_title="Date", yaxis_title="% of Messages")
-    st.plotly_chart(fig1, use_container_width=True)
-    
-    # Words %
-    fig2 = px.bar(
-        trend_df,
-        x="Date",
-        y="Words_%",
-        color="User",
-        title="🗒️ % of Words per User by Day",
-        text_auto=".1f",
-        color_discrete_sequence=px.colors.qualitative.Pastel
-    )
-    fig2.update_layout(barmode="stack", xaxis_title="Date", yaxis_title="% of Words")
-    st.plotly_chart(fig2, use_container_width=True)
+    st.subheader(f"📊 {period}wise User Contribution (%)")
+    day_totals = trend_df.groupby("Date")[metrics].transform("sum")
+    for metric in metrics:
+        trend_df[f"{metric}_%"] = trend_df[metric] * 100.0 / day_totals[metric]
     
-    # Letters %
-    fig3 = px.bar(
-        trend_df,
-        x="Date",
-        y="Letters_%",
-        color="User",
-        title="🔠 % of Letters per User by Day",
-        text_auto=".1f",
-        color_discrete_sequence=px.colors.qualitative.Safe
-    )
-    fig3.update_layout(barmode="stack", xaxis_title="Date", yaxis_title="% of Letters")
-    st.plotly_chart(fig3, use_container_width=True)
+    share_charts = [
+        ("Messages_%", f"💬 % of Messages per User by {period}", "% of Messages", px.colors.qualitative.Dark24),
+        ("Words_%", f"🗒️ % of Words per User by {period}", "% of Words", px.colors.qualitative.Pastel),
+        ("Letters_%", f"🔠 % of Letters per User by {period}", "% of Letters", px.colors.qualitative.Safe)
+    ]
+    user_days = list(trend_df.groupby("User", observed=True))
+    for column, title, yaxis_title, colors in share_charts:
+        fig = go.Figure()
+        for user, sub in user_days:
+            fig.add_bar(name=user, x=sub["Date"].to_numpy(), y=sub[column].to_numpy(), texttemplate="%{y:.1f}")
+        fig.update_layout(barmode="stack", title=title, xaxis_title="Date", yaxis_title=yaxis_title,
+                          legend_title_text="User", colorway=colors)
+        st.plotly_chart(fig, use_container_width=True)
 
 # -----------------------------
 # WordCloud Tab
 # -----------------------------
 with tabs[1]:
     st.header("☁️ Word Cloud & Word Frequency")
-    all_text = " ".join(df["Message"].tolist()).lower()
-    stopwords = set(["the", "is", "and", "to", "a", "of", "in", "on", "it", "for", "that", "me", "i", "you", "my"])
-    words = re.findall(r"\b[a-zA-Z']+\b", all_text)
-    filtered = [w for w in words if w not in stopwords]
-    freq = Counter(filtered).most_common(25)
+    freq, cloud_freq = word_stats(data)
     
     st.subheader("📋 Top Words")
     st.dataframe(pd.DataFrame(freq, columns=["Word", "Count"]))
     
-    wc = WordCloud(width=800, height=400, background_color="black", colormap="plasma").generate(" ".join(filtered))
-    fig, ax = plt.subplots()
-    ax.imshow(wc, interpolation="bilinear")
-    ax.axis("off")
-    st.pyplot(fig)
+    if cloud_freq:
+        fig, ax = plt.subplots()
+        ax.imshow(render_wordcloud(cloud_freq), interpolation="bilinear")
+        ax.axis("off")
+        st.pyplot(fig)
+    else:
+        st.info("No words found in this chat.")
 
 # -----------------------------
 # Activity Heatmap Tab
 # -----------------------------
 with tabs[2]:
     st.header("⏰ Hourly Message Heatmap")
-    df["Hour"] = df["Datetime"].dt.hour
-    pivot = df.pivot_table(index="User", columns="Hour", values="Message", aggfunc="count", fill_value=0)
+    pivot = hourly_activity(data)
     fig, ax = plt.subplots(figsize=(10, 3))
     sns.heatmap(pivot, cmap="rocket_r", ax=ax)
     ax.set_title("Messages per Hour (Dark Mode)")
@@ -228,9 +315,7 @@ with tabs[2]:
 # -----------------------------
 with tabs[3]:
     st.header("😂 Emoji Breakdown")
-    all_emojis = "".join(df["Message"].apply(lambda x: "".join(ch for ch in x if ch in emoji.EMOJI_DATA)))
-    counts = Counter(all_emojis)
-    top10 = counts.most_common(10)
+    top10 = emoji_stats(data)
     if top10:
         emoji_df = pd.DataFrame(top10, columns=["Emoji", "Count"])
         fig = px.pie(emoji_df, values="Count", names="Emoji", title="Top Emojis",
@@ -245,15 +330,8 @@ with tabs[3]:
 # -----------------------------
 with tabs[4]:
     st.header("⏱️ Response Lag (Avg Reply Time)")
-    lags = []
-    for i in range(1, len(df)):
-        prev_user = df.iloc[i-1]["User"]
-        curr_user = df.iloc[i]["User"]
-        if prev_user != curr_user:
-            lags.append([prev_user, curr_user, df.iloc[i]["Minutes"] - df.iloc[i-1]["Minutes"]])
-    if lags:
-        lag_df = pd.DataFrame(lags, columns=["Sender", "Responder", "Lag_Min"])
-        avg_lag = lag_df.groupby("Responder")["Lag_Min"].mean().round(2)
+    avg_lag = average_reply_lag(data)
+    if not avg_lag.empty:
         st.dataframe(avg_lag)
         fig = px.bar(avg_lag, x=avg_lag.index, y="Lag_Min",
                      title="Average Reply Time (Minutes)", color=avg_lag.index)
@@ -264,10 +342,21 @@ with tabs[4]:
 # -----------------------------
 # Timeline Tab
 # -----------------------------
+TIMELINE_MAX_POINTS = 5000
+
 with tabs[5]:
     st.header("🧩 Conversation Timeline")
-    df["Timestamp"] = df["Datetime"].dt.strftime("%Y-%m-%d %H:%M")
-    fig = px.scatter(df, x="Timestamp", y="User", color="User",
-                     hover_data=["Message"], title="Chat Timeline",
-                     color_discrete_sequence=px.colors.qualitative.Bold)
+    fig = go.Figure()
+    if len(df) > TIMELINE_MAX_POINTS:
+        # One marker per user per hour keeps the browser responsive on long chats
+        st.caption("Large chat: messages are grouped per hour.")
+        hourly = df.groupby([df["Datetime"].dt.floor("60min"), "User"], observed=True).size().reset_index(name="Messages")
+        for user, sub in hourly.groupby("User", observed=True):
+            fig.add_trace(go.Scattergl(x=sub["Datetime"], y=sub["User"], mode="markers", name=user,
+                                       customdata=sub["Messages"], hovertemplate="%{x|%Y-%m-%d %H:00}<br>%{customdata} messages"))
+    else:
+        for user, sub in df.groupby("User", observed=True):
+            fig.add_trace(go.Scattergl(x=sub["Datetime"], y=sub["User"], mode="markers", name=user,
+                                       customdata=sub["Message"], hovertemplate="%{x|%Y-%m-%d %H:%M}<br>%{customdata}"))
+    fig.update_layout(title="Chat Timeline", colorway=px.colors.qualitative.Bold)
     st.plotly_chart(fig, use_container_width=True)